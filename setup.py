@@ -5,12 +5,21 @@ setup(
     version="1.0.0",
     description="Wi-Fi MCP Server for network monitoring",
     packages=find_packages(),
+    py_modules=["wifi_mcp_server"],
     install_requires=[
         "mcp>=1.0.0",
     ],
+    extras_require={
+        # Faster JSON encoding/decoding; stdlib json is used when absent
+        "fast": ["orjson"],
+        # Scan over nl80211 netlink instead of running iw/iwlist
+        "netlink": ["pyroute2"],
+        # Persist the last scan so a restarted server starts warm
+        "cache": ["diskcache"],
+    },
     entry_points={
         "console_scripts": [
-            "wifi-mcp-server=wifi_mcp_server:main",
+            "wifi-mcp-server=wifi_mcp_server:cli",
         ],
     },
     python_requires=">=3.8",
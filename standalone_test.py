@@ -19,25 +19,27 @@ async def test_wifi_functions():
 
     print("=== Direct Wi-Fi Function Tests ===\n")
 
-    try:
-        print("1. Testing list_interfaces...")
-        interfaces = await server.list_interfaces()
-        print(f"Interfaces: {interfaces}\n")
-
-        print("2. Testing get_wifi_status...")
-        status = await server.get_wifi_status()
-        print(f"Status: {status}\n")
-
-        print("3. Testing scan_wifi...")
-        scan_results = await server.scan_wifi()
-        print(f"Scan results: {scan_results}\n")
-
-        print("4. Testing get_signal_strength...")
-        signal = await server.get_signal_strength()
-        print(f"Signal: {signal}\n")
-
-    except Exception as e:
-        print(f"Error during testing: {e}")
+    # The probes shell out independently, so let their waits overlap
+    results = await asyncio.gather(
+        server.list_interfaces(),
+        server.get_wifi_status(),
+        server.scan_wifi(),
+        server.get_signal_strength(),
+        return_exceptions=True,
+    )
+
+    tests = [
+        ("1. Testing list_interfaces...", "Interfaces"),
+        ("2. Testing get_wifi_status...", "Status"),
+        ("3. Testing scan_wifi...", "Scan results"),
+        ("4. Testing get_signal_strength...", "Signal"),
+    ]
+    for (title, label), result in zip(tests, results):
+        print(title)
+        if isinstance(result, Exception):
+            print(f"Error during testing: {result}\n")
+        else:
+            print(f"{label}: {result}\n")
 
 
 if __name__ == "__main__":
@@ -3,18 +3,165 @@
 Test script for Wi-Fi MCP Server
 """
 
+import argparse
 import asyncio
 import json
 import subprocess
 import sys
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Tools exercised by run_all_tests, in order
+TOOL_NAMES = ["list_interfaces", "get_wifi_status", "scan_wifi", "get_signal_strength"]
+
+# How long to wait for the server to answer the batch support probe
+BATCH_PROBE_TIMEOUT = 2.0
+
+# MCP stdio frames are newline-delimited JSON; allow large scan results to
+# arrive as one line instead of overrunning the default 64 KiB reader limit
+STREAM_LIMIT = 8 * 1024 * 1024
+
+# How much of the server's stderr to keep for error reporting
+STDERR_TAIL_BYTES = 4096
+
+
+def _encode_frame(message: Any) -> bytes:
+    """Serialize a JSON-RPC message as one newline-terminated frame"""
+    if orjson is not None:
+        return orjson.dumps(message) + b"\n"
+    return (json.dumps(message) + "\n").encode()
+
+
+def _decode_frame(data: bytes) -> Any:
+    """Parse a JSON-RPC frame straight from bytes
+
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can
+    catch the latter either way.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode())
+
+
+# The handshake never changes, so encode its frames once at import
+_INIT_FRAME = _encode_frame(
+    {
+        "jsonrpc": "2.0",
+        "id": 0,
+        "method": "initialize",
+        "params": {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {"name": "test-client", "version": "1.0.0"},
+        },
+    }
+)
+_INITIALIZED_FRAME = _encode_frame(
+    {"jsonrpc": "2.0", "method": "notifications/initialized"}
+)
 
 
 class MCPTester:
     """Simple MCP server tester"""
 
-    def __init__(self, server_command: str):
+    def __init__(
+        self, server_command: Optional[str] = None, server_addr: Optional[str] = None
+    ):
         self.server_command = server_command
+        self.server_addr = server_addr
+        self.process = None
+        self.reader = None
+        self.writer = None
+        self._next_id = 1
+        self._stderr_task = None
+        self._stderr_tail = bytearray()
+
+    def next_id(self) -> int:
+        """Return a fresh JSON-RPC request id for the shared server stream"""
+        request_id = self._next_id
+        self._next_id += 1
+        return request_id
+
+    async def start(self):
+        """Connect to the server once and perform the MCP handshake
+
+        With a server address this connects to an already running server;
+        otherwise the server command is spawned and spoken to over stdio.
+        """
+        if self.server_addr:
+            await self._connect(self.server_addr)
+        else:
+            await self._spawn()
+        await self.initialize_server()
+
+    async def _connect(self, address: str):
+        """Open a socket connection to a server started with --listen"""
+        kind, _, target = address.partition(":")
+        if kind == "unix":
+            self.reader, self.writer = await asyncio.open_unix_connection(
+                target, limit=STREAM_LIMIT
+            )
+        elif kind == "tcp":
+            host, _, port = target.rpartition(":")
+            self.reader, self.writer = await asyncio.open_connection(
+                host.strip("[]"), int(port), limit=STREAM_LIMIT
+            )
+        else:
+            raise ValueError(f"Invalid server address: {address}")
+
+    async def _spawn(self):
+        """Start the server command with its stdio connected to pipes"""
+        self.process = await asyncio.create_subprocess_exec(
+            *self.server_command.split(),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=STREAM_LIMIT,
+            # Only the stdio pipes are inheritable (PEP 446); skip the fd sweep
+            close_fds=False,
+        )
+        # Nothing else reads stderr; drain it so the server never blocks on
+        # a full pipe while writing diagnostics
+        self._stderr_task = asyncio.create_task(self._drain_stderr(self.process))
+        self.reader, self.writer = self.process.stdout, self.process.stdin
+
+    async def stop(self):
+        """Close the connection and terminate the server if we started it"""
+        if self.process is None:
+            if self.writer is not None:
+                self.writer.close()
+                await self.writer.wait_closed()
+                self.reader = self.writer = None
+            return
+        if self.process.returncode is None:
+            self.process.terminate()
+        await self.process.wait()
+        self.process = None
+        self.reader = self.writer = None
+
+        self._stderr_task.cancel()
+        try:
+            await self._stderr_task
+        except asyncio.CancelledError:
+            pass
+        self._stderr_task = None
+
+    async def _drain_stderr(self, process):
+        """Continuously read server stderr, keeping only the most recent tail"""
+        while True:
+            chunk = await process.stderr.read(STDERR_TAIL_BYTES)
+            if not chunk:
+                break
+            self._stderr_tail += chunk
+            del self._stderr_tail[:-STDERR_TAIL_BYTES]
+
+    def stderr_tail(self) -> str:
+        """Return the last few KiB the server wrote to stderr"""
+        return self._stderr_tail.decode(errors="replace")
 
     async def send_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Send a request to the MCP server"""
@@ -23,104 +170,107 @@ class MCPTester:
             stdin=asyncio.subprocess.PIPE,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
+            close_fds=False,
         )
 
         # Send request
-        request_json = json.dumps(request) + "\n"
-        stdout, stderr = await process.communicate(request_json.encode())
+        stdout, stderr = await process.communicate(_encode_frame(request))
 
         if process.returncode != 0:
             print(f"Server error: {stderr.decode()}")
             return {"error": "Server failed"}
 
         try:
-            return json.loads(stdout.decode())
+            return _decode_frame(stdout)
         except json.JSONDecodeError as e:
             print(f"JSON decode error: {e}")
             print(f"Raw output: {stdout.decode()}")
             return {"error": "Invalid JSON response"}
 
-    async def initialize_server(self, process):
+    async def initialize_server(self):
         """Initialize the MCP server with proper handshake"""
         # Send initialize request
-        init_request = {
-            "jsonrpc": "2.0",
-            "id": 0,
-            "method": "initialize",
-            "params": {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {},
-                "clientInfo": {"name": "test-client", "version": "1.0.0"},
-            },
-        }
-
-        init_json = json.dumps(init_request) + "\n"
-        process.stdin.write(init_json.encode())
-        await process.stdin.drain()
+        self.writer.write(_INIT_FRAME)
+        await self.writer.drain()
 
         # Read initialize response
-        response_line = await process.stdout.readline()
+        response_line = await self.reader.readline()
         if response_line:
             try:
-                init_response = json.loads(response_line.decode())
+                init_response = _decode_frame(response_line)
                 print(f"Initialize response: {init_response}")
             except json.JSONDecodeError:
                 print(f"Failed to parse init response: {response_line.decode()}")
 
         # Send initialized notification
-        initialized_notification = {
-            "jsonrpc": "2.0",
-            "method": "notifications/initialized",
-        }
-
-        notification_json = json.dumps(initialized_notification) + "\n"
-        process.stdin.write(notification_json.encode())
-        await process.stdin.drain()
+        self.writer.write(_INITIALIZED_FRAME)
+        await self.writer.drain()
 
     async def send_request_to_running_server(
-        self, process, request: Dict[str, Any]
+        self, request: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Send a request to an already running server"""
-        request_json = json.dumps(request) + "\n"
-        process.stdin.write(request_json.encode())
-        await process.stdin.drain()
+        self.writer.write(_encode_frame(request))
+        await self.writer.drain()
 
         # Read response
-        response_line = await process.stdout.readline()
+        response_line = await self.reader.readline()
         if not response_line:
+            if self._stderr_tail:
+                print(f"Server stderr:\n{self.stderr_tail()}")
             return {"error": "No response"}
 
         try:
-            return json.loads(response_line.decode())
+            return _decode_frame(response_line)
         except json.JSONDecodeError as e:
             print(f"JSON decode error: {e}")
             print(f"Raw output: {response_line.decode()}")
             return {"error": "Invalid JSON response"}
 
-    async def test_list_tools(self):
-        """Test listing available tools"""
-        print("Testing list_tools...")
-        request = {"jsonrpc": "2.0", "id": 1, "method": "tools/list", "params": {}}
+    async def send_batch(
+        self, requests: List[Dict[str, Any]], timeout: Optional[float] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Send a JSON-RPC batch in one write and return responses in request order
 
-        # Start server process
-        process = await asyncio.create_subprocess_exec(
-            *self.server_command.split(),
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
+        Returns None if the server does not answer with a batch response.
+        """
+        self.writer.write(_encode_frame(requests))
+        await self.writer.drain()
 
         try:
-            # Initialize server
-            await self.initialize_server(process)
+            response_line = await asyncio.wait_for(self.reader.readline(), timeout)
+        except asyncio.TimeoutError:
+            return None
 
-            # Send the actual request
-            response = await self.send_request_to_running_server(process, request)
-            print(f"Response: {json.dumps(response, indent=2)}")
-            return response
-        finally:
-            process.terminate()
-            await process.wait()
+        try:
+            responses = _decode_frame(response_line)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(responses, list):
+            return None
+
+        # Batch responses may come back in any order; match them up by id
+        by_id = {r.get("id"): r for r in responses if isinstance(r, dict)}
+        return [by_id.get(r["id"], {"error": "No response"}) for r in requests]
+
+    async def supports_batch(self) -> bool:
+        """Probe whether the server accepts JSON-RPC batches"""
+        probe = [{"jsonrpc": "2.0", "id": self.next_id(), "method": "ping"}]
+        return await self.send_batch(probe, timeout=BATCH_PROBE_TIMEOUT) is not None
+
+    async def test_list_tools(self):
+        """Test listing available tools"""
+        print("Testing list_tools...")
+        request = {
+            "jsonrpc": "2.0",
+            "id": self.next_id(),
+            "method": "tools/list",
+            "params": {},
+        }
+
+        response = await self.send_request_to_running_server(request)
+        print(f"Response: {json.dumps(response, indent=2)}")
+        return response
 
     async def test_tool_call(self, tool_name: str, arguments: Dict[str, Any] = None):
         """Test calling a specific tool"""
@@ -130,64 +280,109 @@ class MCPTester:
 
         request = {
             "jsonrpc": "2.0",
-            "id": 2,
+            "id": self.next_id(),
             "method": "tools/call",
             "params": {"name": tool_name, "arguments": arguments},
         }
 
-        # Start server process
-        process = await asyncio.create_subprocess_exec(
-            *self.server_command.split(),
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
+        response = await self.send_request_to_running_server(request)
+        print(f"Response: {json.dumps(response, indent=2)}")
+        return response
 
-        try:
-            # Initialize server
-            await self.initialize_server(process)
+    async def run_sequential_tests(self):
+        """Run all tests one request at a time"""
+        # Test 1: List tools
+        await self.test_list_tools()
 
-            # Send the actual request
-            response = await self.send_request_to_running_server(process, request)
+        # Tests 2-5: Call each tool
+        for tool_name in TOOL_NAMES:
+            print("\n" + "=" * 50 + "\n")
+            await self.test_tool_call(tool_name)
+
+    async def run_batch_tests(self) -> bool:
+        """Run all tests as a single JSON-RPC batch
+
+        Returns False if the server does not support batching.
+        """
+        if not await self.supports_batch():
+            return False
+
+        labels = ["Testing list_tools..."] + [
+            f"Testing tool call: {tool_name}" for tool_name in TOOL_NAMES
+        ]
+        requests = [
+            {
+                "jsonrpc": "2.0",
+                "id": self.next_id(),
+                "method": "tools/list",
+                "params": {},
+            }
+        ] + [
+            {
+                "jsonrpc": "2.0",
+                "id": self.next_id(),
+                "method": "tools/call",
+                "params": {"name": tool_name, "arguments": {}},
+            }
+            for tool_name in TOOL_NAMES
+        ]
+
+        responses = await self.send_batch(requests)
+        if responses is None:
+            return False
+
+        for i, (label, response) in enumerate(zip(labels, responses)):
+            if i:
+                print("\n" + "=" * 50 + "\n")
+            print(label)
             print(f"Response: {json.dumps(response, indent=2)}")
-            return response
-        finally:
-            process.terminate()
-            await process.wait()
+        return True
 
     async def run_all_tests(self):
         """Run all tests"""
         print("=== MCP Wi-Fi Server Tests ===\n")
 
-        # Test 1: List tools
-        await self.test_list_tools()
-        print("\n" + "=" * 50 + "\n")
-
-        # Test 2: List interfaces
-        await self.test_tool_call("list_interfaces")
-        print("\n" + "=" * 50 + "\n")
-
-        # Test 3: Get Wi-Fi status
-        await self.test_tool_call("get_wifi_status")
-        print("\n" + "=" * 50 + "\n")
-
-        # Test 4: Scan Wi-Fi networks
-        await self.test_tool_call("scan_wifi")
-        print("\n" + "=" * 50 + "\n")
-
-        # Test 5: Get signal strength
-        await self.test_tool_call("get_signal_strength")
+        # Start the server once and share it across all tests
+        await self.start()
+        try:
+            if not await self.run_batch_tests():
+                print(
+                    "Server does not support JSON-RPC batches, running sequentially\n"
+                )
+                await self.run_sequential_tests()
+        finally:
+            await self.stop()
 
 
 async def main():
     """Main function to run tests"""
-    if len(sys.argv) < 2:
+    parser = argparse.ArgumentParser(description="Test the Wi-Fi MCP server")
+    parser.add_argument(
+        "--server-addr",
+        default=None,
+        help=(
+            "Connect to a server started with --listen (unix:/path or "
+            "tcp:host:port) instead of spawning one"
+        ),
+    )
+    parser.add_argument(
+        "server_command",
+        nargs=argparse.REMAINDER,
+        help="Command that starts the server in stdio mode",
+    )
+    args = parser.parse_args()
+
+    if not args.server_addr and not args.server_command:
         print("Usage: python test_wifi_server.py <server_command>")
+        print("       python test_wifi_server.py --server-addr <address>")
         print("Example: python test_wifi_server.py 'python wifi_server.py'")
+        print(
+            "Example: python test_wifi_server.py --server-addr unix:/tmp/wifi-mcp.sock"
+        )
         sys.exit(1)
 
-    server_command = " ".join(sys.argv[1:])
-    tester = MCPTester(server_command)
+    server_command = " ".join(args.server_command) or None
+    tester = MCPTester(server_command, server_addr=args.server_addr)
     await tester.run_all_tests()
 
 
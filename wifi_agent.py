@@ -1,6 +1,75 @@
-import requests
+import asyncio
+import httpx
 import json
 import argparse
+import ipaddress
+import re
+import socket
+import time
+from urllib.parse import urlsplit
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+
+def _dumps(obj):
+    """Serialize obj to compact JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _canonical_json(obj):
+    """Serialize obj with sorted keys so equal values give equal bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, sort_keys=True, separators=(",", ":")).encode()
+
+
+# Identical tool calls completing within this many seconds share a result
+TOOL_RESULT_TTL = 0.2
+
+# Seconds between keepalive pings to the LLM server; pooled connections are
+# kept idle for twice that, so each ping finds the last one still open
+KEEPALIVE_INTERVAL = 30.0
+
+
+def resolve_url(url, timeout=2.0):
+    """Resolve the host of an http URL once, up front.
+
+    Returns (url, host_header). The URL has its hostname replaced by the
+    address that accepted a test connection, and host_header carries the
+    original authority for the Host header. HTTPS URLs, numeric hosts and
+    unreachable servers are returned unchanged with host_header None, so
+    TLS verification and the normal connection errors still apply.
+    """
+    parts = urlsplit(url)
+    if parts.scheme != "http" or not parts.hostname:
+        return url, None
+    try:
+        ipaddress.ip_address(parts.hostname)
+        return url, None
+    except ValueError:
+        pass
+
+    try:
+        with socket.create_connection(
+            (parts.hostname, parts.port or 80), timeout=timeout
+        ) as sock:
+            address = sock.getpeername()[0]
+    except OSError:
+        return url, None
+
+    host = f"[{address}]" if ":" in address else address
+    netloc = f"{host}:{parts.port}" if parts.port else host
+    return parts._replace(netloc=netloc).geturl(), parts.netloc.rpartition("@")[2]
 
 
 class WifiAgent:
@@ -8,83 +77,243 @@ class WifiAgent:
     A Python agent to interact with a local LLM API for Wi-Fi tool calling.
     """
 
-    def __init__(self, llm_url="http://localhost:11434"):
+    def __init__(self, llm_url="http://localhost:11434", max_concurrent_tools=4):
         # Ensure the URL has proper scheme
         if not llm_url.startswith(("http://", "https://")):
             llm_url = f"http://{llm_url}"
 
-        self.llm_url = llm_url.rstrip("/")
+        # Resolve the LLM host once instead of on every new connection
+        self.llm_url, host_header = resolve_url(llm_url.rstrip("/"))
+        headers = {"Content-Type": "application/json"}
+        if host_header:
+            headers["Host"] = host_header
+        # One pooled client for the whole session so every LLM turn reuses
+        # a kept-alive connection instead of opening a new one. Generation
+        # can take a long time, so only connect/write/pool are bounded.
+        self._client = httpx.AsyncClient(
+            base_url=self.llm_url,
+            headers=headers,
+            limits=httpx.Limits(
+                max_keepalive_connections=8,
+                max_connections=16,
+                keepalive_expiry=2 * KEEPALIVE_INTERVAL,
+            ),
+            timeout=httpx.Timeout(60.0, read=None),
+        )
+        # (tool name, canonical args) -> running call task / (timestamp, result)
+        self._inflight = {}
+        self._tool_results = {}
+        # Bound how many tool calls hit the Wi-Fi server at once
+        self._tool_slots = asyncio.Semaphore(max_concurrent_tools)
         print(f"WifiAgent initialized. Connecting to: {self.llm_url}")
 
-    def _send_request(self, endpoint, payload):
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def call_tool(self, tool_name, tool_args, wifi_server_url, client):
+        """Call a Wi-Fi tool, collapsing duplicate calls into one request
+
+        Small models often emit the same tool call several times in one
+        turn. Concurrent identical calls share a single in-flight request,
+        and calls repeated within TOOL_RESULT_TTL reuse its result. All the
+        Wi-Fi tools are read-only, so sharing results is safe.
+        """
+        # Some models send the arguments as a JSON string
+        if isinstance(tool_args, str):
+            try:
+                tool_args = json.loads(tool_args) if tool_args.strip() else {}
+            except json.JSONDecodeError:
+                pass
+
+        # Reject malformed arguments locally instead of paying a round-trip
+        validate = _VALIDATORS.get(tool_name)
+        if validate is not None:
+            try:
+                validate(tool_args)
+            except fastjsonschema.JsonSchemaException as e:
+                print(f"[Agent]: Invalid arguments for {tool_name}: {e}")
+                return {"status": "error", "message": f"invalid args: {e}"}
+
+        key = (tool_name, _canonical_json(tool_args))
+
+        cached = self._tool_results.get(key)
+        if cached is not None:
+            if time.monotonic() - cached[0] < TOOL_RESULT_TTL:
+                return cached[1]
+            del self._tool_results[key]
+
+        # The call runs in its own task, so one caller being cancelled
+        # doesn't cancel it for the others waiting on the same key
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._run_tool(key, tool_name, tool_args, wifi_server_url, client)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _run_tool(self, key, tool_name, tool_args, wifi_server_url, client):
+        """Make one real tool call and cache a successful result under key"""
+        async with self._tool_slots:
+            result = await call_real_wifi_tool(
+                tool_name, tool_args, wifi_server_url, client
+            )
+        if result.get("status") != "error":
+            self._tool_results[key] = (time.monotonic(), result)
+        return result
+
+    async def keepalive(self, endpoint="/api/tags", interval=KEEPALIVE_INTERVAL):
+        """Periodically hit a cheap endpoint so the pooled connection stays warm
+
+        Runs until cancelled; meant to overlap with the user's think time.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._client.get(endpoint)
+            except httpx.HTTPError:
+                pass
+
+    async def _send_request(
+        self, endpoint, payload, body=None, on_token=None, on_tool_call=None
+    ):
         # Ensure endpoint starts with /
         if not endpoint.startswith("/"):
             endpoint = f"/{endpoint}"
 
         url = f"{self.llm_url}{endpoint}"
-        headers = {"Content-Type": "application/json"}
+        if body is None:
+            body = _dumps(payload)
 
         print(f"DEBUG: Making request to: {url}")  # Debug line
 
         try:
-            response = requests.post(url, headers=headers, data=json.dumps(payload))
+            if payload.get("stream"):
+                async with self._client.stream(
+                    "POST", endpoint, content=body
+                ) as response:
+                    if response.is_error:
+                        await response.aread()
+                    response.raise_for_status()
+                    return await self._collect_stream(response, on_token, on_tool_call)
+
+            response = await self._client.post(endpoint, content=body)
             response.raise_for_status()
             return response.json()
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             print(f"Error: Could not connect to LLM server at {url}.")
             print("Please ensure Ollama is running. Try: ollama serve")
             return None
-        except requests.exceptions.HTTPError as http_err:
+        except httpx.HTTPStatusError as http_err:
             print(f"HTTP error occurred: {http_err}")
-            if hasattr(response, "text"):
-                print(f"Response: {response.text}")
+            print(f"Response: {http_err.response.text}")
             return None
-        except requests.exceptions.RequestException as req_err:
+        except httpx.HTTPError as req_err:
             print(f"An unexpected request error occurred: {req_err}")
             return None
         except json.JSONDecodeError:
             print(f"Error: Could not decode JSON response from {url}")
-            if hasattr(response, "text"):
+            if not payload.get("stream"):
                 print(f"Response: {response.text}")
             return None
 
-    def chat_with_tools(self, model, messages, tools=None, stream=False, options=None):
+    async def _collect_stream(self, response, on_token=None, on_tool_call=None):
+        """Accumulate an NDJSON chat stream into a single chat response.
+
+        on_token is called with each content fragment as it arrives and
+        on_tool_call with each tool call as soon as it has been emitted, so
+        callers can print progressively and start tools before the
+        generation finishes.
+        """
+        content = []
+        tool_calls = []
+        chunk = {}
+
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            message = chunk.get("message", {})
+
+            token = message.get("content")
+            if token:
+                content.append(token)
+                if on_token:
+                    on_token(token)
+
+            for tool_call in message.get("tool_calls") or []:
+                tool_calls.append(tool_call)
+                if on_tool_call:
+                    on_tool_call(tool_call)
+
+            if chunk.get("done"):
+                break
+
+        message = {"role": "assistant", "content": "".join(content)}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        chunk["message"] = message
+        return chunk
+
+    async def chat_with_tools(
+        self,
+        model,
+        messages,
+        tools=None,
+        stream=False,
+        options=None,
+        on_token=None,
+        on_tool_call=None,
+    ):
         payload = {
             "model": model,
             "messages": messages,
             "stream": stream,
         }
-        if tools:
-            payload["tools"] = tools
         if options:
             payload["options"] = options
 
+        body = _dumps(payload)
+        if tools:
+            # The tool schema is static, so splice in the pre-serialized copy
+            # rather than re-encoding it on every turn
+            tools_json = _TOOLS_JSON if tools is TOOLS_AVAILABLE else _dumps(tools)
+            body = body[:-1] + b',"tools":' + tools_json + b"}"
+
         print(f"\n--- Sending chat_with_tools request to model: {model} ---")
-        response_data = self._send_request("/api/chat", payload)
+        response_data = await self._send_request(
+            "/api/chat",
+            payload,
+            body=body,
+            on_token=on_token,
+            on_tool_call=on_tool_call,
+        )
         return response_data
 
 
-def call_real_wifi_tool(tool_name, tool_args, wifi_server_url):
+async def call_real_wifi_tool(tool_name, tool_args, wifi_server_url, client):
     print(f"\n[Agent]: Calling Wi-Fi tool: {tool_name} with args: {tool_args}")
     try:
-        response = requests.post(
+        response = await client.post(
             f"{wifi_server_url}/execute",
             json={"tool_name": tool_name, "tool_args": tool_args},
         )
         response.raise_for_status()
         return response.json()
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         print(f"Error: Could not connect to Wi-Fi server at {wifi_server_url}.")
         print("Please ensure your Wi-Fi server is running and accessible.")
         return {
             "status": "error",
             "message": f"Could not connect to Wi-Fi server at {wifi_server_url}",
         }
-    except requests.exceptions.HTTPError as http_err:
-        print(f"Wi-Fi HTTP error occurred: {http_err} - Response: {response.text}")
+    except httpx.HTTPStatusError as http_err:
+        text = http_err.response.text
+        print(f"Wi-Fi HTTP error occurred: {http_err} - Response: {text}")
         return {
             "status": "error",
-            "message": f"Wi-Fi HTTP error: {http_err} - {response.text}",
+            "message": f"Wi-Fi HTTP error: {http_err} - {text}",
         }
     except Exception as e:
         print(f"An unexpected error occurred while calling Wi-Fi tool: {e}")
@@ -94,6 +323,131 @@ def call_real_wifi_tool(tool_name, tool_args, wifi_server_url):
         }
 
 
+# Short commands that map directly onto a tool and skip the LLM round-trip
+FAST_PATTERNS = [
+    (re.compile(r"\b(scan|networks?)\b", re.I), "scan_wifi"),
+    (re.compile(r"\b(status|connected)\b", re.I), "get_wifi_status"),
+    (re.compile(r"\b(signal|rssi|quality)\b", re.I), "get_signal_strength"),
+    (re.compile(r"\b(interfaces?|list)\b", re.I), "list_interfaces"),
+]
+# Longer inputs are real questions and always go to the LLM
+FAST_PATH_MAX_WORDS = 3
+
+
+def match_fast_path(user_input):
+    """Return the tool to run directly for a short command, or None"""
+    if len(user_input.split()) > FAST_PATH_MAX_WORDS:
+        return None
+    for pattern, tool_name in FAST_PATTERNS:
+        if pattern.search(user_input):
+            return tool_name
+    return None
+
+
+# Number of recent user turns re-sent to the LLM
+MAX_HISTORY_TURNS = 16
+# Tool results older than this many turns are summarized in the history
+KEEP_TOOL_RESULT_TURNS = 2
+
+
+def _trim_history(
+    history, max_turns=MAX_HISTORY_TURNS, keep_tool_turns=KEEP_TOOL_RESULT_TURNS
+):
+    """Bound the history re-sent to the LLM on every turn (in place).
+
+    Keeps a leading system message plus the last max_turns user turns, and
+    replaces tool results older than keep_tool_turns turns with a one-line
+    summary. Entries are replaced rather than mutated because the same
+    dicts are shared with the conversation log.
+    """
+    system = history[:1] if history and history[0].get("role") == "system" else []
+    user_indices = [i for i, m in enumerate(history) if m.get("role") == "user"]
+    if len(user_indices) > max_turns:
+        first_kept = user_indices[-max_turns]
+        history[:] = system + history[first_kept:]
+        user_indices = [i for i, m in enumerate(history) if m.get("role") == "user"]
+
+    if len(user_indices) <= keep_tool_turns:
+        return
+    summarize_before = user_indices[-keep_tool_turns]
+
+    pending_names = []
+    for i, message in enumerate(history[:summarize_before]):
+        if message.get("role") == "assistant":
+            pending_names = [
+                tc.get("function", {}).get("name", "?")
+                for tc in message.get("tool_calls") or []
+            ]
+        elif message.get("role") == "tool":
+            name = pending_names.pop(0) if pending_names else "?"
+            content = message.get("content", "")
+            if not content.startswith("[tool "):
+                summary = dict(message)
+                summary["content"] = f"[tool {name} returned {len(content)} bytes]"
+                history[i] = summary
+
+
+def start_tool_call(agent, tool_call, wifi_server_url, client):
+    """Start a tool call in the background as soon as the LLM emits it"""
+    function = tool_call["function"]
+    return asyncio.create_task(
+        agent.call_tool(
+            function["name"], function["arguments"], wifi_server_url, client
+        )
+    )
+
+
+class ConversationLog:
+    """Append conversation messages to a JSON Lines file as they happen
+
+    Each message is written immediately (one JSON object per line) from an
+    executor, so a crash loses nothing and long sessions never stall on a
+    single large write at exit. With no path, messages are discarded.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._file = None
+        if path:
+            try:
+                self._file = open(path, "ab", buffering=0)
+            except OSError as e:
+                print(f"Failed to open conversation log {path}: {e}")
+
+    async def append(self, entry):
+        if self._file is None:
+            return
+        line = _dumps(entry) + b"\n"
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._file.write, line)
+        except OSError as e:
+            print(f"Failed to write conversation to file: {e}")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            print(f"\nConversation written to {self.path}")
+
+
+class StreamPrinter:
+    """Print streamed assistant tokens as they arrive"""
+
+    def __init__(self):
+        self.started = False
+
+    def __call__(self, token):
+        if not self.started:
+            print("Assistant: ", end="")
+            self.started = True
+        print(token, end="", flush=True)
+
+    def finish(self):
+        if self.started:
+            print()
+
+
 def get_wifi_tools():
     return [
         {
@@ -107,7 +461,11 @@ def get_wifi_tools():
                         "interface": {
                             "type": "string",
                             "description": "Wi-Fi interface (optional)",
-                        }
+                        },
+                        "force_refresh": {
+                            "type": "boolean",
+                            "description": "Bypass cached scan results (optional)",
+                        },
                     },
                 },
             },
@@ -157,8 +515,19 @@ def get_wifi_tools():
 
 TOOLS_AVAILABLE = get_wifi_tools()
 
+# Argument validators compiled once from the tool schemas (if available)
+_VALIDATORS = (
+    {
+        tool["function"]["name"]: fastjsonschema.compile(tool["function"]["parameters"])
+        for tool in TOOLS_AVAILABLE
+    }
+    if fastjsonschema is not None
+    else {}
+)
+_TOOLS_JSON = _dumps(TOOLS_AVAILABLE)
+
 
-def main():
+async def main():
     parser = argparse.ArgumentParser(description="Wi-Fi Agent CLI")
     parser.add_argument(
         "--llm-url", default="http://localhost:11434", help="LLM API URL"
@@ -168,16 +537,35 @@ def main():
         "--wifi-server-url", default="http://localhost:8080", help="Wi-Fi server URL"
     )
     parser.add_argument(
-        "--output-file", default=None, help="Write conversation to this file"
+        "--max-concurrent-tools",
+        type=int,
+        default=4,
+        help="Maximum number of concurrent Wi-Fi tool calls",
+    )
+    parser.add_argument(
+        "--output-file",
+        default=None,
+        help="Append the conversation to this file as JSON Lines",
     )
     args = parser.parse_args()
 
     llm_url = args.llm_url
     llm_model = args.model
-    wifi_server_url = args.wifi_server_url
+    wifi_server_url, wifi_host_header = resolve_url(args.wifi_server_url.rstrip("/"))
     output_file = args.output_file
 
-    agent = WifiAgent(llm_url=llm_url)
+    agent = WifiAgent(llm_url=llm_url, max_concurrent_tools=args.max_concurrent_tools)
+    # Pool sized to match the agent's tool concurrency limit
+    wifi_client = httpx.AsyncClient(
+        headers={"Host": wifi_host_header} if wifi_host_header else None,
+        limits=httpx.Limits(
+            max_connections=args.max_concurrent_tools,
+            max_keepalive_connections=args.max_concurrent_tools,
+        ),
+        timeout=httpx.Timeout(60.0),
+    )
+    loop = asyncio.get_running_loop()
+    keepalive = asyncio.create_task(agent.keepalive())
 
     print("\n--- Starting Conversation with Tool-Enabled Wi-Fi Agent ---")
     print(
@@ -186,22 +574,57 @@ def main():
     print("Type 'exit' to quit.")
 
     conversation_history = []
-    conversation_log = []
+    conversation_log = ConversationLog(output_file)
 
     while True:
-        user_input = input("\nUser: ")
+        # Read input off the event loop so it stays free for network I/O
+        user_input = await loop.run_in_executor(None, input, "\nUser: ")
         if user_input.lower() == "exit":
             break
 
         conversation_history.append({"role": "user", "content": user_input})
-        conversation_log.append({"role": "user", "content": user_input})
+        await conversation_log.append({"role": "user", "content": user_input})
+        _trim_history(conversation_history)
+
+        fast_tool = match_fast_path(user_input)
+        if fast_tool:
+            tool_output = await agent.call_tool(
+                fast_tool, {}, wifi_server_url, wifi_client
+            )
+            print(f"[Agent]: Tool '{fast_tool}' returned: {tool_output}")
+
+            # Record the call so the LLM sees it on later turns
+            tool_request = {
+                "role": "assistant",
+                "content": "",
+                "tool_calls": [{"function": {"name": fast_tool, "arguments": {}}}],
+            }
+            tool_history_entry = {"role": "tool", "content": json.dumps(tool_output)}
+            conversation_history.extend([tool_request, tool_history_entry])
+            await conversation_log.append(
+                {"role": "assistant", "content": tool_request}
+            )
+            await conversation_log.append(tool_history_entry)
+            continue
 
-        llm_response = agent.chat_with_tools(
-            llm_model, conversation_history, tools=TOOLS_AVAILABLE
+        printer = StreamPrinter()
+        tool_tasks = []
+        llm_response = await agent.chat_with_tools(
+            llm_model,
+            conversation_history,
+            tools=TOOLS_AVAILABLE,
+            stream=True,
+            on_token=printer,
+            on_tool_call=lambda tool_call: tool_tasks.append(
+                start_tool_call(agent, tool_call, wifi_server_url, wifi_client)
+            ),
         )
+        printer.finish()
 
         if not llm_response:
             print("[Agent]: Failed to get a response from LLM.")
+            for task in tool_tasks:
+                task.cancel()
             conversation_history.pop()
             continue
 
@@ -212,13 +635,15 @@ def main():
         if tool_calls:
             print("[Agent]: LLM wants to call a tool!")
             conversation_history.append(response_message)
-            conversation_log.append({"role": "assistant", "content": response_message})
-
-            for tool_call in tool_calls:
+            await conversation_log.append(
+                {"role": "assistant", "content": response_message}
+            )
+
+            # The tools were started while the response streamed in; wait
+            # for all of them and answer with a single follow-up request
+            tool_outputs = await asyncio.gather(*tool_tasks)
+            for tool_call, tool_output in zip(tool_calls, tool_outputs):
                 tool_name = tool_call["function"]["name"]
-                tool_args = tool_call["function"]["arguments"]
-
-                tool_output = call_real_wifi_tool(tool_name, tool_args, wifi_server_url)
                 print(f"[Agent]: Tool '{tool_name}' returned: {tool_output}")
 
                 tool_history_entry = {
@@ -228,50 +653,53 @@ def main():
                 if "id" in tool_call:
                     tool_history_entry["tool_call_id"] = tool_call["id"]
                 conversation_history.append(tool_history_entry)
-                conversation_log.append(tool_history_entry)
-
-                final_llm_response = agent.chat_with_tools(
-                    llm_model, conversation_history, tools=TOOLS_AVAILABLE
+                await conversation_log.append(tool_history_entry)
+            _trim_history(conversation_history)
+
+            printer = StreamPrinter()
+            final_llm_response = await agent.chat_with_tools(
+                llm_model,
+                conversation_history,
+                tools=TOOLS_AVAILABLE,
+                stream=True,
+                on_token=printer,
+            )
+            printer.finish()
+            if final_llm_response and final_llm_response.get("message", {}).get(
+                "content"
+            ):
+                final_content = final_llm_response["message"]["content"]
+                conversation_history.append(
+                    {"role": "assistant", "content": final_content}
+                )
+                await conversation_log.append(
+                    {"role": "assistant", "content": final_content}
+                )
+            else:
+                print(
+                    "[Agent]: LLM did not provide a clear final response after tool execution."
+                )
+                print(f"Assistant (raw tool output): {tool_outputs}")
+                await conversation_log.append(
+                    {"role": "assistant", "content": str(tool_outputs)}
                 )
-                if final_llm_response and final_llm_response.get("message", {}).get(
-                    "content"
-                ):
-                    final_content = final_llm_response["message"]["content"]
-                    print(f"Assistant: {final_content}")
-                    conversation_history.append(
-                        {"role": "assistant", "content": final_content}
-                    )
-                    conversation_log.append(
-                        {"role": "assistant", "content": final_content}
-                    )
-                else:
-                    print(
-                        "[Agent]: LLM did not provide a clear final response after tool execution."
-                    )
-                    print(f"Assistant (raw tool output): {tool_output}")
-                    conversation_log.append(
-                        {"role": "assistant", "content": str(tool_output)}
-                    )
         else:
             if content:
-                print(f"Assistant: {content}")
                 conversation_history.append({"role": "assistant", "content": content})
-                conversation_log.append({"role": "assistant", "content": content})
+                await conversation_log.append({"role": "assistant", "content": content})
             else:
                 print("[Agent]: LLM did not provide a direct response.")
                 print(f"Assistant (raw response): {llm_response}")
-                conversation_log.append(
+                await conversation_log.append(
                     {"role": "assistant", "content": str(llm_response)}
                 )
 
-    if output_file:
-        try:
-            with open(output_file, "w") as f:
-                json.dump(conversation_log, f, indent=2)
-            print(f"\nConversation written to {output_file}")
-        except Exception as e:
-            print(f"Failed to write conversation to file: {e}")
+    keepalive.cancel()
+    await wifi_client.aclose()
+    await agent.aclose()
+
+    conversation_log.close()
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
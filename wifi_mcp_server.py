@@ -5,11 +5,35 @@ Wi-Fi MCP Server - A Model Context Protocol server for Wi-Fi operations
 
 import sys
 import argparse
-from aiohttp import web
 import asyncio
+import base64
+import gzip
 import json
+import os
 import re
-from typing import Any, Dict, List, Optional
+import signal
+import socket
+import stat
+import string
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 try:
     # Try new MCP structure
@@ -33,9 +57,371 @@ except ImportError:
         Tool = None
         TextContent = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # Optional: scan over nl80211 netlink instead of forking iw/iwlist
+    from pyroute2 import IW
+except ImportError:
+    IW = None
+
+try:
+    # Optional: keep the last scan on disk so a restarted server can answer
+    # its first scan request without waiting for the radio
+    import diskcache
+except ImportError:
+    diskcache = None
+
+# How long an auto-detected Wi-Fi interface name is reused, in seconds
+_IFACE_TTL = 60.0
+
+# How long scan results are served from cache, in seconds
+SCAN_TTL = float(os.environ.get("WIFI_MCP_SCAN_TTL", "5.0"))
+
+# Where the on-disk scan cache lives, and how old a scan from a previous
+# run may be and still be served (while a fresh scan runs behind it)
+SCAN_CACHE_DIR = os.path.expanduser(
+    os.environ.get("WIFI_MCP_CACHE_DIR", "~/.cache/wifi-mcp")
+)
+STALE_SCAN_MAX = 30.0
+
+# Tool results are read by programs, so they are compact JSON unless
+# DEBUG is turned on (1, true or yes)
+_PRETTY_JSON = os.environ.get("DEBUG", "").lower() in ("1", "true", "yes")
+
+# How long one link refresh is shared by get_wifi_status and
+# get_signal_strength, in seconds
+_STATE_TTL = 2.0
+
+# Every field 'iw link' reports, as one alternation matched once at the
+# start of each stripped line; the group that matched names the field
+_RE_IW_LINK_LINE = re.compile(
+    r"Connected to (?P<access_point>[A-Fa-f0-9:]{17})"
+    r"|SSID: (?P<connected_ssid>.*)"
+    r"|tx bitrate: (?P<bit_rate>[0-9.]+)"
+    r"|signal: (?P<signal_level>[-\d.]+)"
+)
+
+# Every network device has a directory here; wireless ones carry a
+# phy80211 link (cfg80211) or a wireless directory (wireless extensions)
+_SYS_CLASS_NET = "/sys/class/net"
+
+# /proc/net/wireless has no quality range; cfg80211 scales link quality
+# to 0-70, the same maximum iwconfig reports for its drivers
+_PROC_QUALITY_MAX = 70
+
+# Input schemas shared by the tools that take only an optional interface,
+# and by those that take nothing
+_IFACE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "interface": {
+            "type": "string",
+            "description": "Wi-Fi interface name (optional)",
+        }
+    },
+}
+_EMPTY_SCHEMA = {"type": "object", "properties": {}}
+
+
+def _dump_bytes(obj: Any) -> bytes:
+    """Serialize obj as compact JSON bytes, e.g. for an HTTP body"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _loads(data: bytes) -> Any:
+    """Parse a JSON request body, using orjson when available
+
+    Both parsers raise a ValueError subclass on invalid input.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_object(value: Any, what: str) -> Dict[str, Any]:
+    """Return value if it is a JSON object, otherwise raise ValueError"""
+    if not isinstance(value, dict):
+        raise ValueError(f"{what} must be a JSON object")
+    return value
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize a tool result as JSON, using orjson when available
+
+    The output is compact, or indented when _PRETTY_JSON is set.
+    """
+    if not _PRETTY_JSON:
+        return _dump_bytes(obj).decode()
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
+
+def _gzip_b64(text: str) -> str:
+    """Wrap a tool result as base64-encoded gzip for thin remote links
+
+    Level 1 already gets most of the ratio on repetitive scan JSON, at a
+    fraction of the CPU cost of the higher levels.
+    """
+    payload = base64.b64encode(gzip.compress(text.encode(), compresslevel=1))
+    return _dumps({"gzip_b64": payload.decode("ascii")})
+
+
+def _decode_ssid(raw: bytes) -> str:
+    """Decode an SSID, interning it since the same few recur in every scan"""
+    return sys.intern(raw.decode("utf-8", errors="replace"))
+
+
+class Network(NamedTuple):
+    """One cached scan result
+
+    A tuple costs a fraction of the dict a parser builds, which adds up
+    across cached scans of a dense area. Missing fields are None.
+    """
+
+    # 6 raw bytes when it parsed as a MAC address, else the text as given
+    bssid: Union[bytes, str, None]
+    ssid: Optional[str] = None
+    signal: Optional[float] = None
+    # MHz; iw reports whole numbers, iwlist converts from GHz
+    frequency: Optional[float] = None
+
+
+def _pack_network(network: Dict[str, Any]) -> Network:
+    """Shrink a parsed network for caching: its BSSID becomes 6 raw bytes"""
+    bssid = network.get("bssid")
+    if isinstance(bssid, str):
+        try:
+            packed = bytes.fromhex(bssid.replace(":", ""))
+        except ValueError:
+            packed = b""
+        if len(packed) == 6:
+            bssid = packed
+    return Network(
+        bssid, network.get("ssid"), network.get("signal"), network.get("frequency")
+    )
+
+
+def _unpack_network(network: Network) -> Dict[str, Any]:
+    """Render a cached network for output, with a colon-separated BSSID
+
+    Fields the scan didn't report are left out, as the parsers do.
+    """
+    rendered = {k: v for k, v in zip(Network._fields, network) if v is not None}
+    if isinstance(network.bssid, bytes):
+        rendered["bssid"] = network.bssid.hex(":")
+    return rendered
+
+
+def _mhz(ghz: bytes) -> float:
+    """Convert an iwlist frequency in GHz to MHz"""
+    return float(ghz) * 1000
+
+
+def _is_mac(text: str) -> bool:
+    """Tell whether text is a colon-separated MAC address"""
+    return (
+        len(text) == 17
+        and text[2::3] == ":::::"
+        and all(c in string.hexdigits for c in text.replace(":", ""))
+    )
+
+
+def _leading_token(value: bytes) -> bytes:
+    """Return value up to its first space, e.g. the number before a unit"""
+    return value.partition(b" ")[0]
+
+
+def _is_wireless_netdev(name: str) -> bool:
+    """Tell from sysfs alone whether a network device is wireless"""
+    base = os.path.join(_SYS_CLASS_NET, name)
+    return os.path.exists(os.path.join(base, "phy80211")) or os.path.isdir(
+        os.path.join(base, "wireless")
+    )
+
+
+def _int_dbm(value: str) -> int:
+    """Convert a possibly fractional dBm reading to a whole number"""
+    return int(float(value))
+
+
+# Conversions for the 'iw link' fields that aren't kept as text
+_IW_LINK_CASTS = {"bit_rate": float, "signal_level": _int_dbm}
+
+
+class _IwScanParser:
+    """Incremental parser for 'iw dev <iface> scan' output
+
+    Lines are fed one at a time, so parsing can keep pace with a scan that
+    is still being written instead of waiting for the whole output.
+    """
+
+    def __init__(self):
+        self.networks: List[Dict[str, Any]] = []
+        self.current_network: Dict[str, Any] = {}
+
+    def feed(self, line: bytes):
+        # A new BSS is never indented; the indented "BSS Load:" element
+        # inside an entry must not start one
+        if line.startswith(b"BSS "):
+            if self.current_network:
+                self.networks.append(self.current_network)
+            # "BSS 00:11:22:33:44:55(on wlan0)": the address is a fixed
+            # 17 characters, whatever follows it
+            self.current_network = {"bssid": line[4:21].decode("ascii")}
+            return
+
+        line = line.strip()
+        if line.startswith(b"SSID:"):
+            self.current_network["ssid"] = _decode_ssid(line[6:])
+        elif line.startswith(b"signal: "):
+            # "signal: -60.00 dBm"
+            value = _leading_token(line[8:])
+            try:
+                self.current_network["signal"] = float(value)
+            except ValueError:
+                pass
+        elif line.startswith(b"freq: "):
+            # "freq: 5180", or "freq: 5180.0" from newer iw
+            value = _leading_token(line[6:]).partition(b".")[0]
+            if value.isdigit():
+                self.current_network["frequency"] = int(value)
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Finish the last network and return everything parsed"""
+        if self.current_network:
+            self.networks.append(self.current_network)
+            self.current_network = {}
+        return self.networks
+
+
+class _IwlistScanParser:
+    """Incremental parser for 'iwlist <iface> scan' output, like _IwScanParser"""
+
+    def __init__(self):
+        self.networks: List[Dict[str, Any]] = []
+        self.current_network: Dict[str, Any] = {}
+
+    def feed(self, line: bytes):
+        line = line.strip()
+
+        if line.startswith(b"Cell "):
+            # "Cell 01 - Address: 00:11:22:33:44:55"
+            if self.current_network:
+                self.networks.append(self.current_network)
+            bssid = line.partition(b"Address: ")[2]
+            self.current_network = {"bssid": bssid.decode("ascii")}
+        elif line.startswith(b"ESSID:"):
+            self.current_network["ssid"] = _decode_ssid(line[6:].strip().strip(b'"'))
+        elif line.startswith(b"Frequency:"):
+            # "Frequency:2.412 GHz (Channel 1)"
+            try:
+                self.current_network["frequency"] = _mhz(_leading_token(line[10:]))
+            except ValueError:
+                pass
+        elif b"Signal level=" in line:
+            # "Quality=40/70  Signal level=-60 dBm", or "=60/100" without dBm
+            value = _leading_token(line.partition(b"Signal level=")[2])
+            value = value.partition(b"/")[0]
+            if value.lstrip(b"-").isdigit():
+                self.current_network["signal"] = int(value)
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Finish the last network and return everything parsed"""
+        if self.current_network:
+            self.networks.append(self.current_network)
+            self.current_network = {}
+        return self.networks
+
+
+def _parse_iwconfig_status(output: str, interface: str) -> Dict[str, Any]:
+    """Parse iwconfig output for status information
+
+    iwconfig prints each field in a fixed form, so they are sliced out
+    after their labels without any regex.
+    """
+    status = {"interface": interface}
+
+    for line in output.splitlines():
+        if "ESSID:" in line:
+            # 'ESSID:"Home"', or 'ESSID:off/any' when not associated
+            essid, quote, _ = line.partition('ESSID:"')[2].partition('"')
+            if quote:
+                status["connected_ssid"] = essid
+        elif "Access Point:" in line:
+            # "Access Point: 00:11:22:33:44:55", or "Not-Associated"
+            access_point = line.partition("Access Point: ")[2][:17]
+            if _is_mac(access_point):
+                status["access_point"] = access_point
+        elif "Bit Rate=" in line:
+            # "Bit Rate=300 Mb/s"
+            try:
+                status["bit_rate"] = float(
+                    line.partition("Bit Rate=")[2].partition(" ")[0]
+                )
+            except ValueError:
+                pass
+        elif "Link Quality=" in line:
+            # "Link Quality=40/70  Signal level=-60 dBm"
+            quality = line.partition("Link Quality=")[2].partition(" ")[0]
+            current, slash, maximum = quality.partition("/")
+            if slash and current.isdigit() and maximum.isdigit():
+                status["link_quality"] = {
+                    "current": int(current),
+                    "max": int(maximum),
+                }
+            signal = line.partition("Signal level=")[2].partition(" ")[0]
+            signal = signal.partition("/")[0]
+            if signal.lstrip("-").isdigit():
+                status["signal_level"] = int(signal)
+
+    return status
+
+
+@dataclass
+class InterfaceState:
+    """Link state of one interface, gathered in a single refresh"""
+
+    # Parsed connection status, as returned by get_wifi_status
+    status: Dict[str, Any]
+    # The interface's /proc/net/wireless row, if it has one
+    wireless: Optional[Dict[str, Optional[str]]]
+    # time.monotonic() of the refresh
+    ts: float
+
 
 class WiFiMCPServer:
     def __init__(self):
+        # interface argument -> (detected interface, detection time)
+        self._iface_cache: Dict[Optional[str], Tuple[str, float]] = {}
+        # interface -> (cached at, networks, scan_time)
+        self._scan_cache: Dict[str, Tuple[float, List[Network], float]] = {}
+        # nl80211 socket, opened on first use; the lock keeps scans running in
+        # executor threads from sharing it concurrently
+        self._nl = None
+        self._nl_lock = threading.Lock()
+        # (tool, interface) -> task running that tool's work right now
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        # interface -> last link refresh
+        self._state: Dict[str, InterfaceState] = {}
+        # On-disk scan cache, opened on first use; False once it has failed
+        self._disk = None
+        # /proc/net/wireless, opened on first use and re-read with pread;
+        # False where it doesn't exist
+        self._proc_wireless_fd = None
+        # Background refreshes, held here until they finish
+        self._refreshing = set()
+        # 'iw event' watcher that refreshes the scan cache after any scan;
+        # _monitor_failed stops retrying where iw is missing or 'iw event'
+        # can't run
+        self._monitor_task = None
+        self._monitor_failed = False
         if Server is not None:
             self.server = Server("wifi-server")
             self.setup_handlers()
@@ -47,316 +433,907 @@ class WiFiMCPServer:
         if self.server is None:
             return
 
-        @self.server.list_tools()
-        async def handle_list_tools():
-            """List available Wi-Fi tools"""
-            return [
-                Tool(
-                    name="scan_wifi",
-                    description="Scan for available Wi-Fi networks",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "interface": {
-                                "type": "string",
-                                "description": (
-                                    "Wi-Fi interface name "
-                                    "(optional, defaults to auto-detect)"
-                                ),
-                            }
+        # The tool list never changes, so build it once rather than on
+        # every list_tools request
+        self._tool_list = [
+            Tool(
+                name="scan_wifi",
+                description="Scan for available Wi-Fi networks",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "interface": {
+                            "type": "string",
+                            "description": (
+                                "Wi-Fi interface name "
+                                "(optional, defaults to auto-detect)"
+                            ),
                         },
-                    },
-                ),
-                Tool(
-                    name="get_wifi_status",
-                    description="Get current Wi-Fi connection status",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "interface": {
-                                "type": "string",
-                                "description": ("Wi-Fi interface name (optional)"),
-                            }
+                        "force_refresh": {
+                            "type": "boolean",
+                            "description": (
+                                "Run a new scan instead of returning "
+                                "recent cached results (optional)"
+                            ),
                         },
-                    },
-                ),
-                Tool(
-                    name="get_signal_strength",
-                    description="Get signal strength and quality metrics",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "interface": {
-                                "type": "string",
-                                "description": ("Wi-Fi interface name (optional)"),
-                            }
+                        "compress": {
+                            "type": "boolean",
+                            "description": (
+                                "Return the result as base64-encoded "
+                                'gzip under "gzip_b64" (optional)'
+                            ),
                         },
                     },
-                ),
-                Tool(
-                    name="list_interfaces",
-                    description="List all available network interfaces",
-                    inputSchema={"type": "object", "properties": {}},
-                ),
-            ]
+                },
+            ),
+            Tool(
+                name="get_wifi_status",
+                description="Get current Wi-Fi connection status",
+                inputSchema=_IFACE_SCHEMA,
+            ),
+            Tool(
+                name="get_signal_strength",
+                description="Get signal strength and quality metrics",
+                inputSchema=_IFACE_SCHEMA,
+            ),
+            Tool(
+                name="list_interfaces",
+                description="List all available network interfaces",
+                inputSchema=_EMPTY_SCHEMA,
+            ),
+        ]
+
+        @self.server.list_tools()
+        async def handle_list_tools():
+            """List available Wi-Fi tools"""
+            return self._tool_list
 
         self.handle_list_tools = handle_list_tools
 
+        # Tool name -> coroutine function taking the call's arguments
+        self._dispatch = {
+            "scan_wifi": lambda arguments: self.scan_wifi(
+                arguments.get("interface"),
+                force_refresh=bool(arguments.get("force_refresh")),
+            ),
+            "get_wifi_status": lambda arguments: self.get_wifi_status(
+                arguments.get("interface")
+            ),
+            "get_signal_strength": lambda arguments: self.get_signal_strength(
+                arguments.get("interface")
+            ),
+            "list_interfaces": lambda arguments: self.list_interfaces(),
+        }
+
+        # Whether results are wrapped in TextContent is fixed by the import
+        if TextContent is not None:
+
+            def wrap(text: str):
+                return [TextContent(type="text", text=text)]
+
+        else:
+
+            def wrap(text: str):
+                return text
+
         @self.server.call_tool()
         async def handle_call_tool(name: str, arguments: Dict[str, Any]):
             """Handle tool calls"""
-            try:
-                if name == "scan_wifi":
-                    result = await self.scan_wifi(arguments.get("interface"))
-                elif name == "get_wifi_status":
-                    result = await self.get_wifi_status(arguments.get("interface"))
-                elif name == "get_signal_strength":
-                    result = await self.get_signal_strength(arguments.get("interface"))
-                elif name == "list_interfaces":
-                    result = await self.list_interfaces()
-                else:
-                    raise ValueError(f"Unknown tool: {name}")
-
-                if TextContent is not None:
-                    return [TextContent(type="text", text=json.dumps(result, indent=2))]
-                else:
-                    return json.dumps(result, indent=2)
-            except Exception as e:
-                error_msg = f"Error: {str(e)}"
-                if TextContent is not None:
-                    return [TextContent(type="text", text=error_msg)]
-                else:
-                    return error_msg
+            return wrap(await self.call_tool_text(name, arguments))
 
         self.handle_call_tool = handle_call_tool
 
+    async def call_tool_text(self, name: str, arguments: Dict[str, Any]) -> str:
+        """Run a tool and return its result as JSON text, or an error message
+
+        The HTTP endpoints use this directly, so they get the text without
+        unwrapping TextContent.
+        """
+        try:
+            tool = self._dispatch.get(name)
+            if tool is None:
+                raise ValueError(f"Unknown tool: {name}")
+            result = await tool(arguments)
+
+            text = _dumps(result)
+            if arguments.get("compress"):
+                text = _gzip_b64(text)
+            return text
+        except Exception as e:
+            return f"Error: {str(e)}"
+
     async def run_command(self, command: List[str]) -> str:
-        """Run a system command and return output"""
+        """Run a short system command and return output
+
+        subprocess.run in an executor thread starts faster than an asyncio
+        subprocess with its pipe transports, which dominates for commands
+        like 'ip link' that finish in milliseconds. The thread can't kill
+        the command if the caller is cancelled, so scans, which can take
+        seconds, stream through run_command_lines instead.
+        """
         try:
-            process = await asyncio.create_subprocess_exec(
-                *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, partial(subprocess.run, command, capture_output=True)
             )
-            stdout, stderr = await process.communicate()
+        except FileNotFoundError:
+            raise RuntimeError(f"Command not found: {command[0]}")
 
-            if process.returncode != 0:
-                raise RuntimeError(f"Command failed: {stderr.decode()}")
+        if result.returncode != 0:
+            raise RuntimeError(f"Command failed: {result.stderr.decode()}")
 
-            return stdout.decode()
+        return result.stdout.decode()
+
+    async def run_command_lines(self, command: List[str]) -> AsyncIterator[bytes]:
+        """Run a system command and yield its raw output lines as they arrive
+
+        Raises RuntimeError once the output is exhausted if the command failed.
+        """
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
         except FileNotFoundError:
             raise RuntimeError(f"Command not found: {command[0]}")
 
+        # Collect stderr alongside stdout so a full stderr pipe can't stall it
+        stderr_task = asyncio.ensure_future(process.stderr.read())
+        try:
+            async for line in process.stdout:
+                yield line
+            stderr = await stderr_task
+            await process.wait()
+        finally:
+            # Stop the command if the caller bailed out before the end
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            stderr_task.cancel()
+
+        if process.returncode != 0:
+            raise RuntimeError(f"Command failed: {stderr.decode()}")
+
+    async def _single_flight(self, key: Tuple, factory: Callable[[], Awaitable]):
+        """Share one in-flight run of factory() among concurrent callers
+
+        Parallel tool calls for the same interface then wait on a single
+        set of subprocesses instead of each forking their own. The work runs
+        in its own task, so one caller being cancelled doesn't abort it for
+        the others.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
     async def get_wifi_interface(self, interface: Optional[str] = None) -> str:
         """Get Wi-Fi interface name"""
         if interface:
             return interface
 
+        now = time.monotonic()
+        cached = self._iface_cache.get(interface)
+        if cached is not None and now - cached[1] < _IFACE_TTL:
+            return cached[0]
+
+        # Tool calls arriving together on a cold cache share one detection
+        iface = await self._single_flight(
+            ("detect_interface",), self._detect_wifi_interface
+        )
+        self._iface_cache[interface] = (iface, now)
+        return iface
+
+    def invalidate_wifi_interface(self, interface: Optional[str] = None):
+        """Forget a cached auto-detected interface so the next call re-detects"""
+        self._iface_cache.pop(interface, None)
+
+    async def _detect_wifi_interface(self) -> str:
+        """Probe the system for a Wi-Fi interface"""
+        # sysfs names the wireless devices without running anything
+        has_sysfs = os.path.isdir(_SYS_CLASS_NET)
+        if has_sysfs:
+            for name in sorted(os.listdir(_SYS_CLASS_NET)):
+                if _is_wireless_netdev(name):
+                    return name
+
         # Try to find wireless interface automatically
         try:
             output = await self.run_command(["iwconfig"])
-            lines = output.split("\n")
+            lines = output.splitlines()
             for line in lines:
                 if "IEEE 802.11" in line:
                     return line.split()[0]
         except Exception:
             pass
 
-        # Fallback to common interface names
-        for iface in ["wlan0", "wlp2s0", "wifi0"]:
-            try:
-                await self.run_command(["iwconfig", iface])
+        # Fallback to common interface names, probed concurrently; the
+        # first name in the list that answers still wins. Names sysfs
+        # doesn't know aren't worth a subprocess.
+        candidates = [
+            iface
+            for iface in ["wlan0", "wlp2s0", "wifi0"]
+            if not has_sysfs or os.path.isdir(os.path.join(_SYS_CLASS_NET, iface))
+        ]
+        results = await asyncio.gather(
+            *(self.run_command(["iwconfig", iface]) for iface in candidates),
+            return_exceptions=True,
+        )
+        for iface, result in zip(candidates, results):
+            if not isinstance(result, Exception):
                 return iface
-            except Exception:
-                continue
 
         raise RuntimeError("No Wi-Fi interface found")
 
-    async def scan_wifi(self, interface: Optional[str] = None) -> Dict[str, Any]:
-        """Scan for available Wi-Fi networks"""
+    async def scan_wifi(
+        self, interface: Optional[str] = None, force_refresh: bool = False
+    ) -> Dict[str, Any]:
+        """Scan for available Wi-Fi networks
+
+        Results younger than SCAN_TTL seconds are returned from cache unless
+        force_refresh is set, since a scan takes the radio off-channel for
+        hundreds of milliseconds or more.
+        """
         iface = await self.get_wifi_interface(interface)
+        self._ensure_monitor()
 
-        try:
-            # Try using iw first (modern tool)
-            output = await self.run_command(["iw", "dev", iface, "scan"])
-            networks = self.parse_iw_scan(output)
-        except Exception:
-            # Fallback to iwlist
-            output = await self.run_command(["iwlist", iface, "scan"])
-            networks = self.parse_iwlist_scan(output)
+        now = time.monotonic()
+        cached = self._scan_cache.get(iface)
+        if not force_refresh and cached is not None and now - cached[0] < SCAN_TTL:
+            return {
+                "interface": iface,
+                "networks": [_unpack_network(n) for n in cached[1]],
+                "scan_time": cached[2],
+            }
+
+        if not force_refresh and cached is None:
+            # First scan of iface in this process: serve a recent scan left
+            # by a previous run, refreshing it in the background
+            stored = self._load_disk_scan(iface)
+            # scan_time is the monotonic clock, so it survives a restart but
+            # not a reboot, where the age comes out negative
+            if stored is not None and 0 <= now - stored[1] < STALE_SCAN_MAX:
+                if now - stored[1] >= SCAN_TTL:
+                    self._refresh_scan(iface, interface)
+                return {
+                    "interface": iface,
+                    "networks": [_unpack_network(n) for n in stored[0]],
+                    "scan_time": stored[1],
+                }
 
+        networks, scan_time = await self._single_flight(
+            ("scan_wifi", iface, force_refresh),
+            lambda: self._scan(iface, interface, force_refresh),
+        )
         return {
             "interface": iface,
-            "networks": networks,
-            "scan_time": asyncio.get_event_loop().time(),
+            "networks": [_unpack_network(n) for n in networks],
+            "scan_time": scan_time,
         }
 
-    def parse_iw_scan(self, output: str) -> List[Dict[str, Any]]:
-        """Parse iw scan output"""
-        networks = []
-        current_network = {}
+    async def _scan(
+        self, iface: str, interface: Optional[str], force_refresh: bool = False
+    ) -> Tuple[List[Network], float]:
+        """Get the networks around iface and cache them
 
-        for line in output.split("\n"):
-            line = line.strip()
+        Unless force_refresh is set, this first reads the kernel's BSS list
+        with 'iw dev <iface> scan dump', which takes milliseconds and holds
+        whatever the last scan by anyone found. Only an empty list, or a
+        forced refresh, triggers a real scan.
+        """
+        networks = None
+        if not force_refresh:
+            try:
+                networks = await self._scan_dump(iface) or None
+            except RuntimeError:
+                pass  # no iw; scan as before
+
+        if networks is None and IW is not None:
+            try:
+                networks = await asyncio.get_running_loop().run_in_executor(
+                    None, self._scan_with_netlink, iface
+                )
+            except Exception:
+                pass  # e.g. not permitted to trigger scans; use the tools
 
-            if line.startswith("BSS "):
-                if current_network:
-                    networks.append(current_network)
-                current_network = {"bssid": line.split()[1].rstrip(":")}
-            elif "SSID:" in line:
-                current_network["ssid"] = line.split("SSID: ")[1]
-            elif "signal:" in line:
-                signal_match = re.search(r"signal: ([-\d.]+)", line)
-                if signal_match:
-                    current_network["signal"] = float(signal_match.group(1))
-            elif "freq:" in line:
-                freq_match = re.search(r"freq: (\d+)", line)
-                if freq_match:
-                    current_network["frequency"] = int(freq_match.group(1))
-
-        if current_network:
-            networks.append(current_network)
+        if networks is None:
+            try:
+                networks = await self._scan_with_tools(iface)
+            except RuntimeError:
+                # The interface may have gone away; re-detect next time
+                self.invalidate_wifi_interface(interface)
+                raise
 
-        return networks
+        return self._store_scan(iface, networks)
 
-    def parse_iwlist_scan(self, output: str) -> List[Dict[str, Any]]:
-        """Parse iwlist scan output"""
-        networks = []
-        current_network = {}
+    def _store_scan(
+        self, iface: str, networks: List[Dict[str, Any]]
+    ) -> Tuple[List[Network], float]:
+        """Cache a completed scan of iface in memory and on disk
 
-        for line in output.split("\n"):
-            line = line.strip()
+        Returns the cached (packed) networks and the scan time.
+        """
+        scan_time = time.monotonic()
+        networks = [_pack_network(n) for n in networks]
+        self._scan_cache[iface] = (scan_time, networks, scan_time)
+        self._store_disk_scan(iface, networks, scan_time)
+        return networks, scan_time
+
+    def _in_background(self, awaitable: Awaitable):
+        """Run awaitable as a background task whose failures are ignored"""
+        task = asyncio.ensure_future(awaitable)
+        # Hold a reference until it finishes; a failed refresh just leaves
+        # the old results in place for the next request to retry
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def _refresh_scan(self, iface: str, interface: Optional[str]):
+        """Start a background scan of iface, sharing any scan already running"""
+        self._in_background(
+            self._single_flight(
+                ("scan_wifi", iface, False), lambda: self._scan(iface, interface)
+            )
+        )
+
+    def _ensure_monitor(self):
+        """Start watching 'iw event' for finished scans, once per server"""
+        if self._monitor_task is None and not self._monitor_failed:
+            self._monitor_task = asyncio.ensure_future(self._consume_monitor())
+
+    async def _consume_monitor(self):
+        """Refresh the scan cache whenever the kernel finishes a scan
+
+        Scans requested by NetworkManager, wpa_supplicant or another client
+        also land in the kernel's BSS table, and a 'scan dump' reads it back
+        in milliseconds, so one long-running 'iw event' process keeps the
+        cache warm without any of those scans being repeated here.
+        """
+        try:
+            monitor = await asyncio.create_subprocess_exec(
+                "iw",
+                "event",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+        except OSError:
+            # iw missing or not executable
+            self._monitor_failed = True
+            self._monitor_task = None
+            return
+
+        try:
+            # Events look like "wlan0 (phy #0): scan finished: 2412 ..."
+            async for line in monitor.stdout:
+                head, _, event = line.partition(b": ")
+                if not event.startswith(b"scan finished"):
+                    continue
+                iface = head.partition(b" ")[0].decode("ascii", errors="replace")
+                # Only keep interfaces somebody has asked to scan
+                if iface in self._scan_cache:
+                    self._in_background(
+                        self._single_flight(
+                            ("scan_dump", iface),
+                            partial(self._refresh_from_dump, iface),
+                        )
+                    )
+            # 'iw event' runs until killed, so it exiting by itself means it
+            # can't work here (no nl80211, no permission); respawning it on
+            # every scan would cost the fork this watcher exists to save
+            self._monitor_failed = True
+        finally:
+            if monitor.returncode is None:
+                monitor.kill()
+                # Reap it now; the loop may be closing underneath us
+                await monitor.wait()
+            self._monitor_task = None
+
+    async def _scan_dump(self, iface: str) -> List[Dict[str, Any]]:
+        """Read the kernel's current BSS list for iface without scanning"""
+        lines = self.run_command_lines(["iw", "dev", iface, "scan", "dump"])
+        try:
+            return await self.parse_iw_scan_lines(lines)
+        finally:
+            await lines.aclose()
+
+    async def _refresh_from_dump(self, iface: str):
+        """Cache the kernel's current BSS list for iface"""
+        self._store_scan(iface, await self._scan_dump(iface))
+
+    def _open_disk_cache(self):
+        """Return the on-disk scan cache, or None if it is unavailable"""
+        if self._disk is None:
+            self._disk = False
+            if diskcache is not None:
+                try:
+                    self._disk = diskcache.Cache(SCAN_CACHE_DIR)
+                except Exception:
+                    pass  # e.g. read-only home directory
+        # Not `or`: an empty Cache is falsy
+        return None if self._disk is False else self._disk
+
+    def _load_disk_scan(self, iface: str) -> Optional[Tuple[List[Network], float]]:
+        """Return (networks, scan_time) stored by a previous run, if any"""
+        disk = self._open_disk_cache()
+        if disk is None:
+            return None
+        try:
+            stored = disk.get(("networks", iface))
+            if stored is None:
+                return None
+            networks, scan_time = stored
+            return [Network._make(n) for n in networks], scan_time
+        except Exception:
+            return None
+
+    def _store_disk_scan(self, iface: str, networks: List[Network], scan_time: float):
+        """Persist a scan so the next server process can start warm"""
+        disk = self._open_disk_cache()
+        if disk is None:
+            return
+        # Plain tuples, so the entry unpickles whether this module runs as
+        # a script or is imported
+        stored = ([tuple(n) for n in networks], scan_time)
+        try:
+            disk.set(("networks", iface), stored, expire=STALE_SCAN_MAX)
+        except Exception:
+            pass
+
+    def _scan_with_netlink(self, iface: str) -> List[Dict[str, Any]]:
+        """Trigger a scan over nl80211 and return the networks found
+
+        Blocks until the scan completes, so call it from an executor.
+        """
+        with self._nl_lock:
+            if self._nl is None:
+                self._nl = IW()
+            results = list(self._nl.scan(socket.if_nametoindex(iface)))
+
+        networks = []
+        for msg in results:
+            bss = msg.get_attr("NL80211_ATTR_BSS")
+            if bss is None:
+                continue
+            network = {"bssid": bss.get_attr("NL80211_BSS_BSSID")}
+            elements = bss.get_attr("NL80211_BSS_INFORMATION_ELEMENTS") or {}
+            if "SSID" in elements:
+                network["ssid"] = _decode_ssid(elements["SSID"])
+            signal = bss.get_attr("NL80211_BSS_SIGNAL_MBM")
+            if signal is not None:
+                network["signal"] = signal["SIGNAL_STRENGTH"]["VALUE"]
+            frequency = bss.get_attr("NL80211_BSS_FREQUENCY")
+            if frequency is not None:
+                network["frequency"] = frequency
+            networks.append(network)
+        return networks
 
-            if "Cell" in line and "Address:" in line:
-                if current_network:
-                    networks.append(current_network)
-                current_network = {"bssid": line.split("Address: ")[1]}
-            elif "ESSID:" in line:
-                essid = line.split("ESSID:")[1].strip().strip('"')
-                current_network["ssid"] = essid
-            elif "Signal level=" in line:
-                signal_match = re.search(r"Signal level=([-\d]+)", line)
-                if signal_match:
-                    current_network["signal"] = int(signal_match.group(1))
-            elif "Frequency:" in line:
-                freq_match = re.search(r"Frequency:([\d.]+)", line)
-                if freq_match:
-                    current_network["frequency"] = (
-                        float(freq_match.group(1)) * 1000
-                    )  # Convert to MHz
-
-        if current_network:
-            networks.append(current_network)
+    async def _scan_with_tools(self, iface: str) -> List[Dict[str, Any]]:
+        """Scan with the iw and iwlist command-line tools"""
+        # Run iw (modern tool) and iwlist side by side and keep the first one
+        # that succeeds, so a missing or failing iw doesn't add its latency
+        # in front of the iwlist fallback
+        tasks = {
+            asyncio.ensure_future(self._scan_with_iw(iface)): "iw",
+            asyncio.ensure_future(self._scan_with_iwlist(iface)): "iwlist",
+        }
+        networks = None
+        errors = []
+        try:
+            pending = set(tasks)
+            while pending and networks is None:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                # Prefer iw's results if both finished together
+                for task in tasks:
+                    if task in done:
+                        if task.exception() is None:
+                            networks = task.result()
+                            break
+                        errors.append(f"{tasks[task]}: {str(task.exception()).strip()}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
+        if networks is None:
+            raise RuntimeError("; ".join(errors))
         return networks
 
+    async def _scan_with_iw(self, iface: str) -> List[Dict[str, Any]]:
+        """Scan with iw, parsing while the scan output streams in"""
+        lines = self.run_command_lines(["iw", "dev", iface, "scan"])
+        try:
+            return await self.parse_iw_scan_lines(lines)
+        finally:
+            await lines.aclose()
+
+    async def _scan_with_iwlist(self, iface: str) -> List[Dict[str, Any]]:
+        """Scan with iwlist, parsing its output line by line as it is read"""
+        lines = self.run_command_lines(["iwlist", iface, "scan"])
+        try:
+            return await self.parse_iwlist_scan_lines(lines)
+        finally:
+            await lines.aclose()
+
+    def parse_iw_scan(self, output: Union[str, bytes]) -> List[Dict[str, Any]]:
+        """Parse iw scan output"""
+        if isinstance(output, str):
+            output = output.encode()
+        parser = _IwScanParser()
+        for line in output.splitlines():
+            parser.feed(line)
+        return parser.close()
+
+    async def parse_iw_scan_lines(
+        self, lines: AsyncIterable[bytes]
+    ) -> List[Dict[str, Any]]:
+        """Parse iw scan output as its lines arrive"""
+        parser = _IwScanParser()
+        async for line in lines:
+            parser.feed(line)
+        return parser.close()
+
+    def parse_iwlist_scan(self, output: Union[str, bytes]) -> List[Dict[str, Any]]:
+        """Parse iwlist scan output"""
+        if isinstance(output, str):
+            output = output.encode()
+        parser = _IwlistScanParser()
+        for line in output.splitlines():
+            parser.feed(line)
+        return parser.close()
+
+    async def parse_iwlist_scan_lines(
+        self, lines: AsyncIterable[bytes]
+    ) -> List[Dict[str, Any]]:
+        """Parse iwlist scan output as its lines arrive"""
+        parser = _IwlistScanParser()
+        async for line in lines:
+            parser.feed(line)
+        return parser.close()
+
     async def get_wifi_status(self, interface: Optional[str] = None) -> Dict[str, Any]:
         """Get current Wi-Fi connection status"""
         iface = await self.get_wifi_interface(interface)
+        state = await self._interface_state(iface, interface)
+        return dict(state.status)
+
+    async def _interface_state(
+        self, iface: str, interface: Optional[str]
+    ) -> InterfaceState:
+        """Return the link state of iface, refreshing it if it is stale
+
+        get_wifi_status and get_signal_strength both read this, so an agent
+        asking for both gets one /proc read and one 'iw link' between them.
+        """
+        state = self._state.get(iface)
+        if state is not None and time.monotonic() - state.ts < _STATE_TTL:
+            return state
+        return await self._single_flight(
+            ("state", iface), lambda: self._refresh_state(iface, interface)
+        )
+
+    async def _refresh_state(
+        self, iface: str, interface: Optional[str]
+    ) -> InterfaceState:
+        """Gather the link state of iface in one pass"""
+        wireless = self._read_proc_wireless(iface)
+        status = await self._get_wifi_status(iface, interface, wireless)
+        state = InterfaceState(
+            status=status,
+            wireless=wireless,
+            ts=time.monotonic(),
+        )
+        # Don't hold on to failures; the next call should retry
+        if "error" not in status:
+            self._state[iface] = state
+        return state
+
+    async def _get_wifi_status(
+        self,
+        iface: str,
+        interface: Optional[str],
+        stats: Optional[Dict[str, Optional[str]]],
+    ) -> Dict[str, Any]:
+        """Build the status of iface from /proc/net/wireless and 'iw dev link'
 
+        Link quality and signal level come from iface's already-read
+        /proc/net/wireless row; a single 'iw dev <iface> link' adds the
+        SSID, access point and bit rate. iwconfig is only used without iw.
+        """
         try:
-            output = await self.run_command(["iwconfig", iface])
-            return self.parse_iwconfig_status(output, iface)
-        except Exception as e:
-            return {"error": str(e), "interface": iface}
+            output = await self.run_command(["iw", "dev", iface, "link"])
+        except RuntimeError:
+            try:
+                output = await self.run_command(["iwconfig", iface])
+                return self.parse_iwconfig_status(output, iface)
+            except RuntimeError as e:
+                self.invalidate_wifi_interface(interface)
+                return {"error": str(e), "interface": iface}
+            except Exception as e:
+                return {"error": str(e), "interface": iface}
 
-    def parse_iwconfig_status(self, output: str, interface: str) -> Dict[str, Any]:
-        """Parse iwconfig output for status information"""
+        status = self.parse_iw_link(output, iface)
+        signal_level = status.pop("signal_level", None)
+        quality = None
+        if stats is not None:
+            try:
+                quality = _int_dbm(stats["quality"])
+                signal_level = _int_dbm(stats["signal_dbm"])
+            except ValueError:
+                pass
+        if quality is None and signal_level is not None:
+            # Derive it from the signal the way cfg80211 does for wext
+            quality = min(max(signal_level, -110), -40) + 110
+        if quality is not None:
+            status["link_quality"] = {"current": quality, "max": _PROC_QUALITY_MAX}
+        if signal_level is not None:
+            status["signal_level"] = signal_level
+        return status
+
+    def parse_iw_link(self, output: str, interface: str) -> Dict[str, Any]:
+        """Parse 'iw dev <iface> link' output for status information"""
         status = {"interface": interface}
 
-        for line in output.split("\n"):
-            if "ESSID:" in line:
-                essid_match = re.search(r'ESSID:"([^"]*)"', line)
-                if essid_match:
-                    status["connected_ssid"] = essid_match.group(1)
-            elif "Access Point:" in line:
-                ap_match = re.search(r"Access Point: ([A-Fa-f0-9:]{17})", line)
-                if ap_match:
-                    status["access_point"] = ap_match.group(1)
-            elif "Bit Rate=" in line:
-                rate_match = re.search(r"Bit Rate=([0-9.]+)", line)
-                if rate_match:
-                    status["bit_rate"] = float(rate_match.group(1))
-            elif "Link Quality=" in line:
-                quality_match = re.search(r"Link Quality=(\d+)/(\d+)", line)
-                if quality_match:
-                    status["link_quality"] = {
-                        "current": int(quality_match.group(1)),
-                        "max": int(quality_match.group(2)),
-                    }
-                signal_match = re.search(r"Signal level=([-\d]+)", line)
-                if signal_match:
-                    status["signal_level"] = int(signal_match.group(1))
+        for line in output.splitlines():
+            match = _RE_IW_LINK_LINE.match(line.strip())
+            if match:
+                field = match.lastgroup
+                value = match.group(field)
+                cast = _IW_LINK_CASTS.get(field)
+                status[field] = value if cast is None else cast(value)
 
         return status
 
+    def _read_proc_wireless(self, iface: str) -> Optional[Dict[str, Optional[str]]]:
+        """Return iface's link statistics from /proc/net/wireless, if listed"""
+        try:
+            content = self._pread_proc_wireless()
+        except OSError:
+            return None  # /proc/net/wireless might not be available
+
+        # After two header lines, rows look like " wlan0: 0000   50.  -60. ..."
+        # with names right-aligned; find iface's row without splitting the rest
+        needle = iface.encode() + b":"
+        start = content.find(needle)
+        while start > 0 and content[start - 1] not in b" \n":
+            start = content.find(needle, start + 1)  # a longer name's suffix
+        if start < 0:
+            return None
+        end = content.find(b"\n", start)
+        begin = start + len(needle)
+        stop = end if end >= 0 else None
+        parts = content[begin:stop].split()
+        if len(parts) < 3:
+            return None
+        return {
+            "status": parts[0].decode("ascii", errors="replace"),
+            "quality": parts[1].decode("ascii", errors="replace"),
+            "signal_dbm": parts[2].decode("ascii", errors="replace"),
+            "noise_dbm": (
+                parts[3].decode("ascii", errors="replace") if len(parts) > 3 else None
+            ),
+        }
+
+    def _pread_proc_wireless(self) -> bytes:
+        """Read /proc/net/wireless through a descriptor kept open across calls
+
+        The kernel regenerates the file on every read from offset 0, so a
+        pread on the cached descriptor replaces open/read/close each time.
+        """
+        if self._proc_wireless_fd is None:
+            try:
+                self._proc_wireless_fd = os.open("/proc/net/wireless", os.O_RDONLY)
+            except (FileNotFoundError, PermissionError):
+                self._proc_wireless_fd = False
+                raise
+        if self._proc_wireless_fd is False:
+            raise FileNotFoundError("/proc/net/wireless")
+
+        chunks = []
+        offset = 0
+        while True:
+            try:
+                chunk = os.pread(self._proc_wireless_fd, 8192, offset)
+            except OSError:
+                # Don't keep a broken descriptor; reopen on the next call
+                os.close(self._proc_wireless_fd)
+                self._proc_wireless_fd = None
+                raise
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+            offset += len(chunk)
+
+    def close(self):
+        """Release the cached /proc/net/wireless descriptor"""
+        fd = self._proc_wireless_fd
+        self._proc_wireless_fd = None
+        if fd is not None and fd is not False:
+            os.close(fd)
+
+    async def aclose(self):
+        """Stop the 'iw event' watcher and release the cached descriptor"""
+        task = self._monitor_task
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.close()
+
+    def __del__(self):
+        # __init__ may not have got as far as setting the descriptor
+        if getattr(self, "_proc_wireless_fd", None) is not None:
+            self.close()
+
+    def parse_iwconfig_status(self, output: str, interface: str) -> Dict[str, Any]:
+        """Parse iwconfig output for status information"""
+        return _parse_iwconfig_status(output, interface)
+
     async def get_signal_strength(
         self, interface: Optional[str] = None
     ) -> Dict[str, Any]:
         """Get detailed signal strength information"""
-        status = await self.get_wifi_status(interface)
+        iface = await self.get_wifi_interface(interface)
+        state = await self._interface_state(iface, interface)
+        status = dict(state.status)
 
-        # Add additional signal metrics if available
-        try:
-            iface = status.get("interface", await self.get_wifi_interface(interface))
-
-            # Try to get more detailed info from /proc/net/wireless
-            with open("/proc/net/wireless", "r") as f:
-                content = f.read()
-                for line in content.split("\n"):
-                    if iface in line:
-                        parts = line.split()
-                        if len(parts) >= 4:
-                            status.update(
-                                {
-                                    "wireless_stats": {
-                                        "status": parts[1],
-                                        "quality": parts[2],
-                                        "signal_dbm": parts[3],
-                                        "noise_dbm": parts[4]
-                                        if len(parts) > 4
-                                        else None,
-                                    }
-                                }
-                            )
-                        break
-        except (FileNotFoundError, PermissionError):
-            pass  # /proc/net/wireless might not be available
+        # Add the raw /proc/net/wireless counters if available
+        if state.wireless is not None:
+            status["wireless_stats"] = state.wireless
 
         return status
 
+    def parse_iw_dev(self, output: str) -> Set[str]:
+        """Parse 'iw dev' output into the set of wireless interface names"""
+        wireless = set()
+        for line in output.splitlines():
+            line = line.strip()
+            if line.startswith("Interface "):
+                wireless.add(line.split()[1])
+        return wireless
+
     async def list_interfaces(self) -> Dict[str, Any]:
         """List all network interfaces"""
+        return await self._single_flight(("list_interfaces",), self._list_interfaces)
+
+    async def _list_interfaces(self) -> Dict[str, Any]:
         try:
             # Get list of interfaces
             output = await self.run_command(["ip", "link", "show"])
             interfaces = []
 
-            for line in output.split("\n"):
+            for line in output.splitlines():
                 if ": " in line and not line.startswith(" "):
-                    parts = line.split(": ")
-                    if len(parts) >= 2:
-                        iface_name = parts[1].split("@")[0]  # Remove VLAN info
-
-                        # Check if it's a wireless interface
-                        is_wireless = False
-                        try:
-                            await self.run_command(["iwconfig", iface_name])
-                            is_wireless = True
-                        except Exception:
-                            pass
-
-                        interfaces.append(
-                            {
-                                "name": iface_name,
-                                "is_wireless": is_wireless,
-                                "status": "UP" if "UP" in line else "DOWN",
-                            }
-                        )
+                    # "3: eth0.10@eth0: <...>"; drop the index and VLAN parent
+                    name = line.partition(": ")[2].partition(": ")[0]
+                    iface_name = name.partition("@")[0]
+                    interfaces.append(
+                        {
+                            "name": iface_name,
+                            "is_wireless": False,
+                            "status": "UP" if "UP" in line else "DOWN",
+                        }
+                    )
+
+            # Check which interfaces are wireless: sysfs answers with a stat
+            # per interface; without it 'iw dev' lists them all in one call,
+            # otherwise fall back to probing each with iwconfig
+            if os.path.isdir(_SYS_CLASS_NET):
+                for iface in interfaces:
+                    iface["is_wireless"] = _is_wireless_netdev(iface["name"])
+                return {"interfaces": interfaces}
+
+            try:
+                output = await self.run_command(["iw", "dev"])
+                wireless = self.parse_iw_dev(output)
+                for iface in interfaces:
+                    iface["is_wireless"] = iface["name"] in wireless
+            except RuntimeError:
+                # The probes are independent, so run them concurrently rather
+                # than one fork+exec at a time
+                results = await asyncio.gather(
+                    *(self.run_command(["iwconfig", i["name"]]) for i in interfaces),
+                    return_exceptions=True,
+                )
+                for iface, result in zip(interfaces, results):
+                    iface["is_wireless"] = not isinstance(result, Exception)
 
             return {"interfaces": interfaces}
         except Exception as e:
             return {"error": str(e)}
 
 
+def parse_listen_address(address: str):
+    """Parse a socket address of the form unix:/path or tcp:host:port"""
+    kind, _, target = address.partition(":")
+    if kind == "unix" and target:
+        return "unix", target
+    if kind == "tcp":
+        host, _, port = target.rpartition(":")
+        if host and port.isdigit():
+            return "tcp", (host.strip("[]"), int(port))
+    raise ValueError(f"Invalid listen address: {address}")
+
+
+class _StreamFile:
+    """Minimal async text-file facade over an asyncio stream pair
+
+    stdio_server() only iterates its input line by line and calls
+    write()/flush() on its output, so this lets a socket connection
+    reuse the stdio JSON-RPC transport unchanged.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        line = await self.reader.readline()
+        if not line:
+            raise StopAsyncIteration
+        return line.decode("utf-8", errors="replace")
+
+    async def write(self, data: str):
+        self.writer.write(data.encode("utf-8"))
+
+    async def flush(self):
+        await self.writer.drain()
+
+
+async def serve_socket(server: "WiFiMCPServer", address: str):
+    """Serve MCP sessions over a Unix or TCP socket, one per connection
+
+    Clients connect to an already running server instead of spawning a
+    new process for every session.
+    """
+    kind, target = parse_listen_address(address)
+
+    async def handle_connection(reader, writer):
+        stream = _StreamFile(reader, writer)
+        try:
+            async with stdio_server(stdin=stream, stdout=stream) as (
+                read_stream,
+                write_stream,
+            ):
+                await server.server.run(
+                    read_stream,
+                    write_stream,
+                    server.server.create_initialization_options(),
+                )
+        except Exception as e:
+            print(f"Error in MCP socket session: {e}", file=sys.stderr)
+        finally:
+            writer.close()
+
+    if kind == "unix":
+        # Replace a stale socket left behind by a previous run
+        try:
+            if stat.S_ISSOCK(os.stat(target).st_mode):
+                os.unlink(target)
+        except FileNotFoundError:
+            pass
+        listener = await asyncio.start_unix_server(handle_connection, path=target)
+    else:
+        listener = await asyncio.start_server(handle_connection, *target)
+
+    print(f"Serving MCP on {address}", file=sys.stderr)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        if kind == "unix":
+            try:
+                os.unlink(target)
+            except FileNotFoundError:
+                pass
+
+
 async def main():
     """Main function to run the MCP server with stdio or HTTP"""
     parser = argparse.ArgumentParser(description="Wi-Fi MCP Server")
@@ -377,8 +1354,25 @@ async def main():
         default=8080,
         help="Port for HTTP mode (default: 8080)",
     )
+    parser.add_argument(
+        "--listen",
+        default=None,
+        metavar="ADDR",
+        help=(
+            "In stdio mode, serve MCP on a socket instead of stdin/stdout "
+            "(unix:/path or tcp:host:port)"
+        ),
+    )
     args = parser.parse_args()
 
+    if args.listen:
+        if args.mode != "stdio":
+            parser.error("--listen is only supported in stdio mode")
+        try:
+            parse_listen_address(args.listen)
+        except ValueError as e:
+            parser.error(str(e))
+
     server = WiFiMCPServer()
 
     if server.server is None:
@@ -388,7 +1382,41 @@ async def main():
         )
         sys.exit(1)
 
-    if args.mode == "stdio":
+    # SIGINT or SIGTERM stops whichever server is running, so the shutdown
+    # below still gets to reap 'iw event' and close the cached descriptor
+    serving = asyncio.ensure_future(_serve(server, args))
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, serving.cancel)
+    try:
+        await serving
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await server.aclose()
+
+
+async def _die(server: WiFiMCPServer, signum: int):
+    """Shut server down, then let signum terminate the process as usual"""
+    try:
+        await server.aclose()
+    finally:
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+
+
+async def _serve(server: WiFiMCPServer, args: argparse.Namespace):
+    """Run server in the mode chosen on the command line until it stops"""
+    if args.listen:
+        await serve_socket(server, args.listen)
+    elif args.mode == "stdio":
+        # stdio_server() reads stdin in a thread that cancelling can't
+        # interrupt, so on a signal clean up here and then die by it
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(
+                signum, lambda signum=signum: loop.create_task(_die(server, signum))
+            )
         try:
             # Run the server using stdio
             async with stdio_server() as (read_stream, write_stream):
@@ -401,77 +1429,92 @@ async def main():
             print(f"Error running MCP server: {e}", file=sys.stderr)
             sys.exit(1)
     elif args.mode == "http":
-        # HTTP mode using aiohttp
-        app = web.Application()
+        # HTTP mode using aiohttp, imported here so stdio startup (paid on
+        # every spawn by MCP clients) doesn't load it
+        from aiohttp import web
+
+        routes = web.RouteTableDef()
 
+        # The tool list is static: serialize its response body once
+        tools_body = _dump_bytes(
+            {
+                "result": [
+                    tool.model_dump(mode="json", by_alias=True, exclude_none=True)
+                    for tool in server._tool_list
+                ]
+            }
+        )
+
+        @routes.post("/list_tools")
         async def list_tools_handler(request):
-            try:
-                # No input expected
-                result = await server.handle_list_tools()
-                # If result is a list of TextContent, extract text
-                if isinstance(result, list) and hasattr(result[0], "text"):
-                    result = [x.text for x in result]
-                return web.json_response({"result": result})
-            except Exception as e:
-                return web.json_response({"error": str(e)}, status=500)
+            return web.Response(body=tools_body, content_type="application/json")
 
+        @routes.post("/call_tool")
+        @routes.post("/execute")  # For wifi_agent.py compatibility
         async def call_tool_handler(request):
             try:
-                data = await request.json()
+                data = _json_object(_loads(await request.read()), "request body")
                 name = data.get("tool_name") or data.get("name")
-                arguments = data.get("tool_args") or data.get("arguments", {})
+                arguments = _json_object(
+                    data.get("tool_args") or data.get("arguments", {}), "arguments"
+                )
                 if not name:
                     return web.json_response({"error": "Missing tool_name"}, status=400)
-                result = await server.handle_call_tool(name, arguments)
-                # If result is a list of TextContent, extract text
-                if isinstance(result, list) and hasattr(result[0], "text"):
-                    result = [x.text for x in result]
-                return web.json_response(
-                    result if isinstance(result, dict) else {"result": result}
-                )
+                text = await server.call_tool_text(name, arguments)
+                return web.json_response({"result": [text]})
+            except (KeyError, ValueError) as e:
+                # Includes a body that isn't valid JSON or isn't an object
+                return web.json_response({"error": str(e)}, status=400)
             except Exception as e:
                 return web.json_response({"error": str(e)}, status=500)
 
+        # Standard MCP endpoint
+        @routes.post("/mcp")
         async def mcp_handler(request):
             try:
-                data = await request.json()
+                data = _json_object(_loads(await request.read()), "request body")
                 # Simulate MCP protocol: expects {"method": ..., "params": ...}
                 method = data.get("method")
-                params = data.get("params", {})
+                params = _json_object(data.get("params", {}), "params")
                 if method == "list_tools":
-                    result = await server.handle_list_tools()
+                    return web.Response(
+                        body=tools_body, content_type="application/json"
+                    )
                 elif method == "call_tool":
                     name = params.get("name")
-                    arguments = params.get("arguments", {})
-                    result = await server.handle_call_tool(name, arguments)
+                    arguments = _json_object(params.get("arguments", {}), "arguments")
+                    text = await server.call_tool_text(name, arguments)
                 else:
                     return web.json_response({"error": "Unknown method"}, status=400)
-                # If result is a list of TextContent, extract text
-                if isinstance(result, list) and hasattr(result[0], "text"):
-                    result = [x.text for x in result]
-                return web.json_response({"result": result})
-            except Exception as e:
-                return web.json_response({"error": str(e)}, status=500)
+                return web.json_response({"result": [text]})
+            except (KeyError, ValueError) as e:
+                # Includes a body that isn't valid JSON or isn't an object
+                return web.json_response({"error": str(e)}, status=400)
             except Exception as e:
                 return web.json_response({"error": str(e)}, status=500)
 
-        # Standard MCP endpoints
-        app.router.add_post("/mcp", mcp_handler)
-        app.router.add_post("/list_tools", list_tools_handler)
-        app.router.add_post("/call_tool", call_tool_handler)
-        app.router.add_post(
-            "/execute", call_tool_handler
-        )  # For wifi_agent.py compatibility
+        app = web.Application()
+        app.add_routes(routes)
+        # The routes are final; freeze the router so its lookup is built once
+        app.freeze()
 
         runner = web.AppRunner(app)
         await runner.setup()
         site = web.TCPSite(runner, args.host, args.port)
         print(f"Serving HTTP on {args.host}:{args.port}")
         await site.start()
-        # Run forever
-        while True:
-            await asyncio.sleep(3600)
+        # Park until main() cancels us on SIGINT or SIGTERM, then close the
+        # listener cleanly
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
 
 
-if __name__ == "__main__":
+def cli():
+    """Console script entry point"""
     asyncio.run(main())
+
+
+if __name__ == "__main__":
+    cli()